@@ -1,20 +1,129 @@
 """MCP server with Supabase PostgreSQL database integration."""
 
+import importlib.util
+import json
+import logging
 import os
+import ssl
+import time
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
+import anyio
 import asyncpg
+import orjson
 from mcp.server.fastmcp import Context, FastMCP
 
+# Fixed metadata queries. Keeping the text constant lets asyncpg's
+# per-connection statement cache reuse the server-side prepared statement.
+TABLE_SCHEMA_QUERY = """
+SELECT column_name, data_type, is_nullable, column_default
+FROM information_schema.columns
+WHERE table_name = $1
+ORDER BY ordinal_position;
+"""
+
+ALL_SCHEMAS_QUERY = """
+SELECT table_name, column_name, data_type, is_nullable, column_default
+FROM information_schema.columns
+WHERE table_name = ANY($1::text[])
+ORDER BY table_name, ordinal_position;
+"""
+
+LIST_TABLES_QUERY = """
+SELECT table_name
+FROM information_schema.tables
+WHERE table_schema = 'public'
+AND table_type = 'BASE TABLE'
+ORDER BY table_name;
+"""
+
+# Seconds that list_tables / get_table_schema results are served from memory.
+METADATA_CACHE_TTL = 30.0
+
+# Command tags for plain DML. Any other execute_command result, or any
+# command containing several statements (whose status only reports the last
+# one), invalidates the metadata cache: `CREATE TABLE ... AS` and
+# `SELECT ... INTO` report "SELECT n", so DDL cannot be recognized by tag.
+# Schema changes made outside execute_command are only picked up once the
+# cache TTL expires.
+DML_COMMAND_TAGS = ("INSERT", "UPDATE", "DELETE", "MERGE")
+
+# Default and maximum number of rows returned per execute_query page.
+QUERY_PAGE_SIZE = 1000
+MAX_QUERY_PAGE_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def quote_ident(name: str) -> str:
+    """Quote a PostgreSQL identifier, escaping embedded double quotes."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def records_to_dicts(rows: List[asyncpg.Record]) -> List[Dict[str, Any]]:
+    """Convert records to dicts, reading the column names only once."""
+    if not rows:
+        return []
+    keys = tuple(rows[0].keys())
+    return [dict(zip(keys, row.values())) for row in rows]
+
+
+def records_to_columns(rows: List[asyncpg.Record]) -> Dict[str, List[Any]]:
+    """Convert records to a columnar shape so column names appear only once."""
+    return {
+        "columns": list(rows[0].keys()) if rows else [],
+        "rows": [list(row.values()) for row in rows]
+    }
+
+
+def _encode_json_value(value: Any) -> str:
+    """Encode a json/jsonb parameter; strings are passed through as JSON text."""
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value).decode()
+
+
+def _decode_json_value(text: str) -> Any:
+    """Decode a json/jsonb value with orjson, falling back to the stdlib.
+
+    orjson rejects numbers outside the float range (such as 1e400), which
+    json.loads accepts. Integers beyond 64 bits are decoded as floats by
+    orjson and therefore lose precision.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return json.loads(text)
+
+
+async def init_connection(conn: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns with orjson on every new pool connection."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=_encode_json_value,
+            decoder=_decode_json_value,
+            schema="pg_catalog",
+            format="text",
+        )
+
 
 class SupabaseDatabase:
-    """Supabase PostgreSQL database connection manager."""
+    """Supabase PostgreSQL database connection pool manager."""
 
     def __init__(self):
-        self.connection: Optional[asyncpg.Connection] = None
+        self.pool: Optional[asyncpg.Pool] = None
+        # Cache entries are (expires_at, value) pairs on the time.monotonic() clock.
+        self._tables_cache: Optional[Tuple[float, List[str]]] = None
+        self._table_names: FrozenSet[str] = frozenset()
+        self._schema_cache: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+        # Bumped on invalidation so fetches already in flight don't store stale results.
+        self._cache_generation = 0
 
     @classmethod
     async def connect(cls) -> "SupabaseDatabase":
@@ -33,71 +142,192 @@ class SupabaseDatabase:
             
             db_url = f"postgresql://{user}:{password}@{host}:{port}/{database}"
         
+        # Without a CA file, leave TLS to sslmode in the DSN or PGSSLMODE.
+        # With one, build a single verifying context shared by every pool
+        # connection (Supabase certificates chain to Supabase's own root CA).
+        ssl_ctx = None
+        root_cert = os.getenv("SUPABASE_SSL_ROOT_CERT")
+        if root_cert:
+            ssl_ctx = ssl.create_default_context(cafile=root_cert)
+        
         try:
-            instance.connection = await asyncpg.connect(db_url)
+            instance.pool = await asyncpg.create_pool(
+                db_url,
+                min_size=int(os.getenv("SUPABASE_POOL_MIN", "2")),
+                max_size=int(os.getenv("SUPABASE_POOL_MAX", "10")),
+                max_inactive_connection_lifetime=300,
+                timeout=float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5")),
+                command_timeout=30,
+                ssl=ssl_ctx,
+                server_settings={"application_name": "mcp-supabase", "jit": "off"},
+                statement_cache_size=1024,
+                max_cached_statement_lifetime=0,
+                max_cacheable_statement_size=1024 * 15,
+                init=init_connection,
+            )
             return instance
         except Exception as e:
             raise ConnectionError(f"Failed to connect to Supabase database: {e}")
 
     async def disconnect(self) -> None:
         """Disconnect from database."""
-        if self.connection:
-            await self.connection.close()
+        if self.pool:
+            await self.pool.close()
 
     async def execute_query(self, query: str, *args) -> List[Dict[str, Any]]:
         """Execute a SELECT query and return results as list of dictionaries."""
-        if not self.connection:
+        if not self.pool:
             raise RuntimeError("Database not connected")
         
-        try:
-            rows = await self.connection.fetch(query, *args)
-            return [dict(row) for row in rows]
-        except Exception as e:
-            raise RuntimeError(f"Query execution failed: {e}")
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+        return records_to_dicts(rows)
+
+    async def fetch_page(
+        self, query: str, *args, offset: int = 0, page_size: int = QUERY_PAGE_SIZE
+    ) -> Tuple[Dict[str, List[Any]], bool]:
+        """Fetch one page of a SELECT query through a server-side cursor.
+
+        Only `page_size + 1` rows are pulled from the server; the extra row
+        tells whether more pages follow. Rows are returned in the columnar
+        shape produced by `records_to_columns`.
+
+        Each page re-runs the query in a new read-only transaction and skips
+        `offset` rows, so pages are only consistent when the query has a
+        deterministic ORDER BY and the data does not change between calls.
+        The read-only transaction rejects data-modifying statements.
+        """
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        if not 1 <= page_size <= MAX_QUERY_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_QUERY_PAGE_SIZE}")
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                if offset:
+                    await cursor.forward(offset)
+                rows = await cursor.fetch(page_size + 1)
+        return records_to_columns(rows[:page_size]), len(rows) > page_size
 
     async def execute_command(self, command: str, *args) -> str:
         """Execute an INSERT/UPDATE/DELETE command and return status."""
-        if not self.connection:
+        if not self.pool:
             raise RuntimeError("Database not connected")
         
-        try:
-            result = await self.connection.execute(command, *args)
-            return result
-        except Exception as e:
-            raise RuntimeError(f"Command execution failed: {e}")
+        async with self.pool.acquire() as conn:
+            result = await conn.execute(command, *args)
+        if result.split(" ", 1)[0] not in DML_COMMAND_TAGS or ";" in command.strip().rstrip(";"):
+            self.invalidate_metadata_cache()
+        return result
 
     async def fetch_one(self, query: str, *args) -> Optional[Dict[str, Any]]:
         """Fetch a single row from query."""
-        if not self.connection:
+        if not self.pool:
             raise RuntimeError("Database not connected")
         
-        try:
-            row = await self.connection.fetchrow(query, *args)
-            return dict(row) if row else None
-        except Exception as e:
-            raise RuntimeError(f"Query execution failed: {e}")
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(query, *args)
+        return dict(row) if row else None
 
     async def get_table_schema(self, table_name: str) -> List[Dict[str, Any]]:
         """Get schema information for a table."""
-        query = """
-        SELECT column_name, data_type, is_nullable, column_default
-        FROM information_schema.columns
-        WHERE table_name = $1
-        ORDER BY ordinal_position;
-        """
-        return await self.execute_query(query, table_name)
+        cached = self._schema_cache.get(table_name)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        generation = self._cache_generation
+        schema = await self.execute_query(TABLE_SCHEMA_QUERY, table_name)
+        if generation == self._cache_generation:
+            self._schema_cache[table_name] = (time.monotonic() + METADATA_CACHE_TTL, schema)
+        return schema
+
+    async def get_all_schemas(self, table_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get schema information for several tables in a single round-trip."""
+        now = time.monotonic()
+        schemas: Dict[str, List[Dict[str, Any]]] = {}
+        missing = []
+        for table_name in table_names:
+            cached = self._schema_cache.get(table_name)
+            if cached and now < cached[0]:
+                schemas[table_name] = cached[1]
+            else:
+                missing.append(table_name)
+
+        if missing:
+            fetched: Dict[str, List[Dict[str, Any]]] = {name: [] for name in missing}
+            generation = self._cache_generation
+            rows = await self.execute_query(ALL_SCHEMAS_QUERY, missing)
+            for table_name, columns in groupby(rows, key=itemgetter("table_name")):
+                fetched[table_name] = [
+                    {k: v for k, v in column.items() if k != "table_name"}
+                    for column in columns
+                ]
+            if generation == self._cache_generation:
+                expires_at = time.monotonic() + METADATA_CACHE_TTL
+                for table_name, schema in fetched.items():
+                    self._schema_cache[table_name] = (expires_at, schema)
+            schemas.update(fetched)
+
+        return {table_name: schemas[table_name] for table_name in table_names}
+
+    async def fetch_table_data(self, table_name: str, limit: int) -> Dict[str, List[Any]]:
+        """Fetch up to `limit` rows from a table in the public schema, in columnar shape."""
+        if not self.pool:
+            raise RuntimeError("Database not connected")
+        if not 1 <= limit <= MAX_QUERY_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_QUERY_PAGE_SIZE}")
+        
+        query = f"SELECT * FROM public.{quote_ident(table_name)} LIMIT $1"
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(query, limit)
+        return records_to_columns(rows)
 
     async def list_tables(self) -> List[str]:
         """List all tables in the current schema."""
-        query = """
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        AND table_type = 'BASE TABLE'
-        ORDER BY table_name;
+        if self._tables_cache and time.monotonic() < self._tables_cache[0]:
+            return self._tables_cache[1]
+        generation = self._cache_generation
+        rows = await self.execute_query(LIST_TABLES_QUERY)
+        tables = [row['table_name'] for row in rows]
+        if generation == self._cache_generation:
+            self._tables_cache = (time.monotonic() + METADATA_CACHE_TTL, tables)
+            self._table_names = frozenset(tables)
+        return tables
+
+    async def table_exists(self, table_name: str) -> bool:
+        """Check a table name against the cached list of public tables.
+
+        A miss forces one fresh lookup, so tables created outside
+        execute_command are found without waiting for the cache to expire.
         """
-        rows = await self.execute_query(query)
-        return [row['table_name'] for row in rows]
+        await self.list_tables()
+        if table_name in self._table_names:
+            return True
+        self._tables_cache = None
+        return table_name in await self.list_tables()
+
+    async def warm_metadata_cache(self) -> None:
+        """Preload the table list and every table's schema."""
+        await self.get_all_schemas(await self.list_tables())
+
+    def invalidate_metadata_cache(self) -> None:
+        """Drop cached table and schema metadata."""
+        self._cache_generation += 1
+        self._tables_cache = None
+        self._schema_cache.clear()
+
+
+def error_response(e: Exception) -> Dict[str, Any]:
+    """Build a tool error response, exposing SQLSTATE for PostgreSQL errors."""
+    response: Dict[str, Any] = {
+        "success": False,
+        "error": str(e)
+    }
+    if isinstance(e, asyncpg.PostgresError):
+        response["sqlstate"] = e.sqlstate
+    return response
 
 
 @dataclass
@@ -112,6 +342,12 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     # Initialize on startup
     db = await SupabaseDatabase.connect()
     try:
+        # Warm the metadata caches so the first tool call avoids the round-trips;
+        # a failure here only costs that latency, so it must not abort startup
+        try:
+            await db.warm_metadata_cache()
+        except Exception as e:
+            logger.warning("Metadata cache prefetch failed: %s", e)
         yield AppContext(db=db)
     finally:
         # Cleanup on shutdown
@@ -123,21 +359,28 @@ mcp = FastMCP("Supabase MCP Server", lifespan=app_lifespan)
 
 
 @mcp.tool()
-async def execute_query(ctx: Context, query: str) -> Dict[str, Any]:
-    """Execute a SELECT query on the Supabase database."""
+async def execute_query(
+    ctx: Context, query: str, offset: int = 0, page_size: int = QUERY_PAGE_SIZE
+) -> Dict[str, Any]:
+    """Execute a SELECT query on the Supabase database.
+
+    Results are paginated; pass the returned `next_offset` back as `offset`
+    to fetch the following page. `next_offset` is null on the last page.
+    Every page re-runs the query, so use an ORDER BY for stable pages. The
+    query runs read-only; use execute_command for statements that write.
+    Rows are returned in `data` as {"columns": [...], "rows": [[...], ...]}.
+    """
     db = ctx.request_context.lifespan_context.db
     try:
-        results = await db.execute_query(query)
+        results, has_more = await db.fetch_page(query, offset=offset, page_size=page_size)
         return {
             "success": True,
-            "row_count": len(results),
-            "data": results
+            "row_count": len(results["rows"]),
+            "data": results,
+            "next_offset": offset + len(results["rows"]) if has_more else None
         }
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        return error_response(e)
 
 
 @mcp.tool()
@@ -151,10 +394,7 @@ async def execute_command(ctx: Context, command: str) -> Dict[str, Any]:
             "result": result
         }
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        return error_response(e)
 
 
 @mcp.tool()
@@ -169,10 +409,21 @@ async def get_table_schema(ctx: Context, table_name: str) -> Dict[str, Any]:
             "columns": schema
         }
     except Exception as e:
+        return error_response(e)
+
+
+@mcp.tool()
+async def get_all_schemas(ctx: Context, table_names: List[str]) -> Dict[str, Any]:
+    """Get schema information for multiple tables in one call."""
+    db = ctx.request_context.lifespan_context.db
+    try:
+        schemas = await db.get_all_schemas(table_names)
         return {
-            "success": False,
-            "error": str(e)
+            "success": True,
+            "schemas": schemas
         }
+    except Exception as e:
+        return error_response(e)
 
 
 @mcp.tool()
@@ -186,30 +437,37 @@ async def list_tables(ctx: Context) -> Dict[str, Any]:
             "tables": tables
         }
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        return error_response(e)
 
 
 @mcp.tool()
 async def fetch_table_data(ctx: Context, table_name: str, limit: int = 100) -> Dict[str, Any]:
-    """Fetch data from a specific table with optional limit."""
+    """Fetch data from a specific table with optional limit.
+
+    Rows are returned in `data` as {"columns": [...], "rows": [[...], ...]}.
+    """
     db = ctx.request_context.lifespan_context.db
     try:
-        query = f"SELECT * FROM {table_name} LIMIT $1"
-        results = await db.execute_query(query, limit)
+        if not await db.table_exists(table_name):
+            return {
+                "success": False,
+                "error": f"Unknown table: {table_name}"
+            }
+        results = await db.fetch_table_data(table_name, limit)
         return {
             "success": True,
             "table_name": table_name,
-            "row_count": len(results),
+            "row_count": len(results["rows"]),
             "data": results
         }
     except Exception as e:
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        return error_response(e)
+
+
+def main() -> None:
+    """Run the server over stdio, on uvloop when it is installed."""
+    use_uvloop = importlib.util.find_spec("uvloop") is not None  # not available on Windows
+    anyio.run(mcp.run_stdio_async, backend_options={"use_uvloop": use_uvloop})
 
 
 if __name__ == "__main__":
@@ -227,4 +485,6 @@ if __name__ == "__main__":
             print(f"Connection failed: {e}")
     
     # Uncomment to test connection
-    # asyncio.run(test_connection())
\ No newline at end of file
+    # asyncio.run(test_connection())
+
+    main()
\ No newline at end of file
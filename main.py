@@ -6,70 +6,135 @@ cd to the `examples/snippets/clients` directory and run:
 """
 
 from mcp.server.fastmcp import FastMCP
+import aiofiles
+import asyncio
+import io
 import os
+from collections import defaultdict
 from pathlib import Path
 
 # Create an MCP server
 mcp = FastMCP("AI Sticky Notes")
 NOTES_FILE = os.path.join(os.path.dirname(__file__), "notes.txt")
 
+# In-memory copy of the notes file, loaded on first access. Deleted lines are
+# replaced by None so the positions stored in `_index`, which maps a stripped
+# note to its lines in `_notes`, never shift; `_compact_notes` drops them once
+# they make up half of the cache.
+_notes: list[str | None] | None = None
+_index: defaultdict[str, list[int]] = defaultdict(list)
+_tombstones = 0
+_notes_file_ready = False
+# Serializes cache mutations with the file writes that persist them.
+_write_lock = asyncio.Lock()
+
+def _build_index() -> None:
+    """Index the cached notes by their stripped text."""
+    _index.clear()
+    for i, line in enumerate(_notes):
+        _index[line.strip()].append(i)
+
 def ensure_notes_file_exists():
-    """Ensure the notes file exists."""
-    if not os.path.exists(NOTES_FILE):
-        with open(NOTES_FILE, 'w') as f:
-            f.write("")
+    """Ensure the notes file exists, checking the filesystem only once."""
+    global _notes_file_ready
+    if not _notes_file_ready:
+        Path(NOTES_FILE).touch(exist_ok=True)
+        _notes_file_ready = True
+
+async def load_notes() -> list[str | None]:
+    """Return the cached notes, reading the notes file on first access."""
+    global _notes
+    if _notes is None:
+        ensure_notes_file_exists()
+        async with aiofiles.open(NOTES_FILE, 'r') as f:
+            lines = await f.readlines()
+        # Another call may have loaded (and changed) the cache while we awaited
+        if _notes is None:
+            _notes = lines
+            _build_index()
+    return _notes
+
+async def notes_text() -> str:
+    """Return the current notes as file content."""
+    return "".join(n for n in await load_notes() if n is not None)
+
+async def _compact_notes() -> None:
+    """Rebuild the cache from its live lines, as reading the file back would."""
+    global _notes, _tombstones
+    _notes = io.StringIO(await notes_text(), newline=None).readlines()
+    _tombstones = 0
+    _build_index()
+
+def _write_notes(content: str) -> None:
+    """Atomically replace the notes file with `content`."""
+    tmp_file = NOTES_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
+        f.write(content)
+    os.replace(tmp_file, NOTES_FILE)
+
+async def save_notes() -> None:
+    """Persist the cached notes, rewriting the file off the event loop."""
+    await asyncio.to_thread(_write_notes, await notes_text())
+
 @mcp.tool()
-def add_note(note: str)->str:
+async def add_note(note: str)->str:
     """Add a note to the notes file."""
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'a') as f:
-        f.write(note + "\n")
+    async with _write_lock:
+        notes = await load_notes()
+        # Split the way reading the file back would, so the cache matches it
+        for line in io.StringIO(note + "\n", newline=None).readlines():
+            _index[line.strip()].append(len(notes))
+            notes.append(line)
+        async with aiofiles.open(NOTES_FILE, 'a') as f:
+            await f.write(note + "\n")
     return f"Note added: {note}"
 
 @mcp.tool()
-def delete_note(note: str) -> str:
+async def delete_note(note: str) -> str:
     """Delete a note from the notes file."""
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'r') as f:
-        notes = f.readlines()
-    with open(NOTES_FILE, 'w') as f:
-        for existing_note in notes:
-            if existing_note.strip() != note.strip():
-                f.write(existing_note)
+    global _tombstones
+    async with _write_lock:
+        notes = await load_notes()
+        positions = _index.pop(note.strip(), None)
+        if positions:
+            for i in positions:
+                notes[i] = None
+            _tombstones += len(positions)
+            await save_notes()
+            if _tombstones * 2 > len(notes):
+                await _compact_notes()
     return f"Note deleted: {note}"
 
 @mcp.tool()
-def modify_note(old_note: str, new_note: str) -> str:
+async def modify_note(old_note: str, new_note: str) -> str:
     """Modify a note in the notes file."""
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'r') as f:
-        notes = f.readlines()
-    with open(NOTES_FILE, 'w') as f:
-        for existing_note in notes:
-            if existing_note.strip() == old_note.strip():
-                f.write(new_note + "\n")
-            else:
-                f.write(existing_note)
+    async with _write_lock:
+        notes = await load_notes()
+        positions = _index.pop(old_note.strip(), None)
+        if positions:
+            for i in positions:
+                notes[i] = new_note + "\n"
+            _index[new_note.strip()].extend(positions)
+            await save_notes()
+            # A multi-line replacement spans several file lines; re-split them
+            if "\n" in new_note or "\r" in new_note:
+                await _compact_notes()
     return f"Note modified from '{old_note}' to '{new_note}'"
 
 @mcp.tool()
-def read_notes()->str:
+async def read_notes()->str:
     """Read all notes from the notes file."""
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'r') as f:
-        notes = f.read().strip()
+    notes = (await notes_text()).strip()
     return notes or "No notes found."
 
 @mcp.resource("notes://latest")
-def get_latest_notes() -> str:
+async def get_latest_notes() -> str:
     """Get the latest notes."""
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'r') as f:
-        notes = f.readlines()
-    return "Latest Notes:\n" + "".join(notes) if notes else "No notes found."
+    notes = await notes_text()
+    return "Latest Notes:\n" + notes if notes else "No notes found."
 
 @mcp.prompt()
-def note_summary_prompt()->str:
+async def note_summary_prompt()->str:
     """
     Generate a summary of the notes.
     
@@ -78,9 +143,7 @@ def note_summary_prompt()->str:
       str: A prompt string that includes summary of all the notes and asks for summary.
            If no notes exist, a message will be shown indicating that.
     """
-    ensure_notes_file_exists()
-    with open(NOTES_FILE, 'r') as f:
-        notes = f.read().strip()
+    notes = (await notes_text()).strip()
     if not notes:
         return "No notes found. Please add some notes first."
     summary = "Here are your notes:\n" + "".join(notes)